@@ -0,0 +1,48 @@
+import pandas as pd
+
+# Gemensamma aggregeringar för sidorna och rapportgeneratorn.
+# Alla funktioner tar valfria extra grupperingsnycklar (by) så att samma
+# logik kan räkna en vy i appen eller alla butik × månad i ett svep.
+
+
+# Slår ihop detaljrader med produktnamn och kategori. Beräknar totalpris om det saknas.
+def merge_details(details_df: pd.DataFrame, products_df: pd.DataFrame) -> pd.DataFrame:
+    if "totalprice" not in details_df.columns and {"quantity", "unitprice"}.issubset(details_df.columns):
+        details_df = details_df.assign(totalprice=details_df["quantity"] * details_df["unitprice"])
+
+    if "productid" not in details_df.columns or "productid" not in products_df.columns:
+        return details_df
+
+    cols = [c for c in ["productid", "productname", "category"] if c in products_df.columns]
+    return details_df.merge(products_df[cols], on="productid", how="left")
+
+
+# Summerar försäljning per kategori, störst först. Med dropna=False får rader
+# utan kategori en egen stapel.
+def sales_by_category(merged: pd.DataFrame, by: list[str] | None = None, dropna: bool = True) -> pd.Series:
+    by = list(by or [])
+    return (
+        merged.groupby([*by, "category"], dropna=dropna)["totalprice"]
+        .sum()
+        .sort_values(ascending=False)
+    )
+
+
+# Summerar försäljning per produkt och behåller de n största (per grupp om by anges)
+def top_products(merged: pd.DataFrame, name_col: str, n: int = 10, by: list[str] | None = None) -> pd.Series:
+    by = list(by or [])
+    sums = (
+        merged.groupby([*by, name_col])["totalprice"]
+        .sum()
+        .sort_values(ascending=False)
+    )
+    if by:
+        return sums.groupby(level=by, sort=False).head(n)
+    return sums.head(n)
+
+
+# Summerar försäljning per dag. Utan by fylls dagar utan försäljning med 0 mellan
+# första och sista dagen. Med by kommer bara dagar som har försäljning med.
+def daily_sales(tx: pd.DataFrame, by: list[str] | None = None) -> pd.Series:
+    by = list(by or [])
+    return tx.groupby([*by, pd.Grouper(key="date", freq="D")])["totalamount"].sum()
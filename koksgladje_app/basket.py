@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Korganalys: vilka produkter köps i samma transaktion.
+# Transaktioner × produkter lagras som en gles incidensmatris X, och
+# samförekomsten för alla produktpar fås med en enda matrisprodukt Xᵀ·X.
+
+# Sorteringsnycklar för bought_together, i prioritetsordning
+SORT_ORDERS = {
+    "count": ["count", "lift"],
+    "lift": ["lift", "count"],
+}
+
+
+class BasketIndex:
+    def __init__(self, product_ids: np.ndarray, cooc: sparse.csr_matrix, n_baskets: int):
+        self.product_ids = product_ids
+        self.cooc = cooc
+        self.n_baskets = n_baskets
+        # Antal korgar som innehåller respektive produkt
+        self.counts = cooc.diagonal()
+
+    # Bygger indexet från detaljrader med transactionid och productid
+    @classmethod
+    def from_details(cls, details_df: pd.DataFrame) -> "BasketIndex":
+        rows = details_df.dropna(subset=["transactionid", "productid"])
+        tx_codes, tx_ids = pd.factorize(rows["transactionid"])
+        prod_codes, product_ids = pd.factorize(rows["productid"], sort=True)
+
+        x = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (tx_codes, prod_codes)),
+            shape=(len(tx_ids), len(product_ids)),
+        )
+        # En produkt räknas en gång per korg även om den står på flera rader
+        x.sum_duplicates()
+        x.data[:] = 1
+
+        cooc = (x.T @ x).tocsr()
+        cooc.sort_indices()
+        return cls(np.asarray(product_ids), cooc, len(tx_ids))
+
+    # Returnerar produkter som köpts tillsammans med productid, med
+    # antal gemensamma korgar, support, konfidens och lift.
+    # sort_by är "count" eller "lift".
+    def bought_together(self, productid, top: int = 10, min_count: int = 1, sort_by: str = "count") -> pd.DataFrame:
+        if sort_by not in SORT_ORDERS:
+            raise ValueError(f"Okänd sortering: {sort_by!r}. Välj bland {sorted(SORT_ORDERS)}.")
+
+        columns = ["productid", "count", "support", "confidence", "lift"]
+
+        pos = np.searchsorted(self.product_ids, productid)
+        if pos >= len(self.product_ids) or self.product_ids[pos] != productid or self.n_baskets == 0:
+            return pd.DataFrame(columns=columns)
+
+        # Läser bara produktens rad i den glesa matrisen
+        start, end = self.cooc.indptr[pos], self.cooc.indptr[pos + 1]
+        cols = self.cooc.indices[start:end]
+        pair = self.cooc.data[start:end]
+
+        keep = (cols != pos) & (pair >= min_count)
+        cols, pair = cols[keep], pair[keep]
+
+        support = pair / self.n_baskets
+        confidence = pair / self.counts[pos]
+        lift = confidence / (self.counts[cols] / self.n_baskets)
+
+        result = pd.DataFrame({
+            "productid": self.product_ids[cols],
+            "count": pair,
+            "support": support,
+            "confidence": confidence,
+            "lift": lift,
+        })
+        return result.sort_values(SORT_ORDERS[sort_by], ascending=False).head(top).reset_index(drop=True)
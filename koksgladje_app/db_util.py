@@ -16,3 +16,12 @@ def read_sql(query: str, params: tuple = ()) -> pd.DataFrame:
     with sqlite3.connect(DB_PATH) as conn:
         conn.row_factory = sqlite3.Row  # Gör att kolumnnamn följer SQL-alias
         return pd.read_sql_query(query, conn, params=params)
+
+
+# Returnerar en versionsnyckel för databasen (ändras när filen skrivs om)
+def data_version() -> int:
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"Databas saknas. {DB_PATH}")
+
+    stat = DB_PATH.stat()
+    return hash((stat.st_mtime_ns, stat.st_size))
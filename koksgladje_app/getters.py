@@ -1,10 +1,71 @@
+import os
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-from db_util import read_sql
+from db_util import read_sql, data_version
+from aggregations import merge_details
+from basket import BasketIndex
+from timeseries import PrefixSums
+
+# Copy-on-write gör att vyer delar minne med den cachade tabellen
+# tills någon sida skriver till dem, då kopieras bara det som ändras.
+# Från pandas 3 är det alltid på och inställningen är utfasad.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+# Sätt KOKSGLADJE_CHECK_FRAMES=1 för att även jämföra innehållet i de delade
+# tabellerna vid varje hämtning. Kostar en hashning av hela tabellen per anrop.
+_CHECK_CONTENT = os.environ.get("KOKSGLADJE_CHECK_FRAMES") == "1"
+
+
+# Summerar radhashar till ett fingeravtryck av tabellens innehåll
+def _content_hash(df: pd.DataFrame) -> int:
+    return int(pd.util.hash_pandas_object(df, index=True).sum())
+
+
+# Form och innehåll som en delad tabell ska ha kvar så länge den ligger i cachen
+def _signature(df: pd.DataFrame) -> tuple:
+    return (tuple(df.columns), tuple(df.dtypes), len(df)), _content_hash(df)
+
+
+# Fryser en inläst tabell: numeriska kolumner och datumkolumner läggs i
+# skrivskyddade arrayer så att skrivningar på plats (t.ex. .loc) ger ValueError.
+# Signaturen sparas för mutationskontrollen i _shared.
+def _freeze(df: pd.DataFrame) -> tuple[pd.DataFrame, tuple]:
+    cols = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind in "biufcmM":
+            arr = df[col].to_numpy(copy=True)
+            arr.flags.writeable = False
+            cols[col] = arr
+        else:
+            cols[col] = df[col]
+    frozen = pd.DataFrame(cols, index=df.index, copy=False)
+    return frozen, _signature(frozen)
+
+
+# Returnerar den delade tabellen efter att ha kontrollerat att ingen har ändrat den på plats.
+# Används av härledda cacher som bara läser tabellen.
+def _shared(shared: tuple[pd.DataFrame, tuple]) -> pd.DataFrame:
+    df, (shape, content) = shared
+    changed = (tuple(df.columns), tuple(df.dtypes), len(df)) != shape
+    if not changed and _CHECK_CONTENT:
+        changed = _content_hash(df) != content
+    if changed:
+        raise RuntimeError("Delad tabell har ändrats på plats. Arbeta på en kopia i sidan.")
+    return df
+
+
+# Ger en billig vy av den delade tabellen som sidorna kan lägga till kolumner i
+def _view(shared: tuple[pd.DataFrame, tuple]) -> pd.DataFrame:
+    return _shared(shared).copy(deep=False)
+
 
 # Hämtar alla transaktioner med datum och totalbelopp
-@st.cache_data(ttl=300, show_spinner=False)
-def get_transactions() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_transactions(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             t.TransactionID   AS transactionid,
@@ -18,12 +79,16 @@ def get_transactions() -> pd.DataFrame:
     # Säkerställer att datumkolumnen är i rätt format
     if "date" in df.columns:
         df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    return df
+    return _freeze(df)
+
+
+def get_transactions() -> pd.DataFrame:
+    return _view(_load_transactions(data_version()))
 
 
 # Hämtar detaljerade transaktionsrader (produkter, antal, pris)
-@st.cache_data(ttl=300, show_spinner=False)
-def get_details() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_details(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             td.TransactionID  AS transactionid,
@@ -34,12 +99,28 @@ def get_details() -> pd.DataFrame:
         FROM TransactionDetails td
         ORDER BY td.TransactionID
     """)
-    return df
+    return _freeze(df)
+
+
+def get_details() -> pd.DataFrame:
+    return _view(_load_details(data_version()))
+
+
+# Bygger korganalysen en gång per dataversion. Indexet ändras aldrig efter bygget
+# och delas därför direkt mellan sessionerna.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_basket_index(version: int) -> BasketIndex:
+    details_df = _shared(_load_details(version))
+    return BasketIndex.from_details(details_df)
+
+
+def get_basket_index() -> BasketIndex:
+    return _load_basket_index(data_version())
 
 
 # Hämtar produkter tillsammans med kategorier
-@st.cache_data(ttl=300, show_spinner=False)
-def get_products_with_categories() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_products_with_categories(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             p.ProductID    AS productid,
@@ -53,12 +134,16 @@ def get_products_with_categories() -> pd.DataFrame:
         LEFT JOIN ProductCategories pc ON p.CategoryID = pc.CategoryID
         ORDER BY p.ProductID
     """)
-    return df
+    return _freeze(df)
+
+
+def get_products_with_categories() -> pd.DataFrame:
+    return _view(_load_products_with_categories(data_version()))
 
 
 # Hämtar alla butiker
-@st.cache_data(ttl=300, show_spinner=False)
-def get_stores() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_stores(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             s.StoreID   AS storeid,
@@ -67,29 +152,38 @@ def get_stores() -> pd.DataFrame:
         FROM Stores s
         ORDER BY s.StoreID
     """)
-    return df
+    return _freeze(df)
+
+
+def get_stores() -> pd.DataFrame:
+    return _view(_load_stores(data_version()))
 
 
 # Hämtar kunder. Returnerar tom DataFrame om tabellen saknas.
-@st.cache_data(ttl=300, show_spinner=False)
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_customers(version: int) -> tuple[pd.DataFrame, tuple]:
+    df = read_sql("""
+        SELECT
+            c.CustomerID   AS customerid,
+            c.CustomerName AS customername
+        FROM Customers c
+        ORDER BY c.CustomerID
+    """)
+    return _freeze(df)
+
+
 def get_customers() -> pd.DataFrame:
     try:
-        df = read_sql("""
-            SELECT
-                c.CustomerID   AS customerid,
-                c.CustomerName AS customername
-            FROM Customers c
-            ORDER BY c.CustomerID
-        """)
-        return df
+        return _view(_load_customers(data_version()))
     except Exception:
-        # Fallback om databasen saknar kundtabell
+        # Fallback om databasen saknar kundtabell. Cachas inte, så ett tillfälligt
+        # läsfel (t.ex. låst databas) släpper vid nästa anrop.
         return pd.DataFrame(columns=["customerid", "customername"])
 
 
 # Hämtar alla produktkategorier
-@st.cache_data(ttl=300, show_spinner=False)
-def get_categories() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_categories(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             pc.CategoryID   AS categoryid,
@@ -98,12 +192,16 @@ def get_categories() -> pd.DataFrame:
         FROM ProductCategories pc
         ORDER BY pc.CategoryID
     """)
-    return df
+    return _freeze(df)
+
+
+def get_categories() -> pd.DataFrame:
+    return _view(_load_categories(data_version()))
 
 
 # Summerar försäljning per kategori
-@st.cache_data(ttl=300, show_spinner=False)
-def get_sales_by_category() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_sales_by_category(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             COALESCE(pc.CategoryName, CAST(p.CategoryID AS TEXT)) AS category,
@@ -116,12 +214,16 @@ def get_sales_by_category() -> pd.DataFrame:
         GROUP BY category
         ORDER BY sales_sek DESC
     """)
-    return df
+    return _freeze(df)
+
+
+def get_sales_by_category() -> pd.DataFrame:
+    return _view(_load_sales_by_category(data_version()))
 
 
 # Hämtar månatlig försäljning per kategori
-@st.cache_data(ttl=300, show_spinner=False)
-def get_monthly_sales_by_category() -> pd.DataFrame:
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_monthly_sales_by_category(version: int) -> tuple[pd.DataFrame, tuple]:
     df = read_sql("""
         SELECT
             strftime('%Y-%m', t.TransactionDate) AS ym,
@@ -137,4 +239,51 @@ def get_monthly_sales_by_category() -> pd.DataFrame:
     # Konverterar år-månad till datetime
     if "ym" in df.columns:
         df["ym"] = pd.to_datetime(df["ym"], format="%Y-%m", errors="coerce")
-    return df
\ No newline at end of file
+    return _freeze(df)
+
+
+def get_monthly_sales_by_category() -> pd.DataFrame:
+    return _view(_load_monthly_sales_by_category(data_version()))
+
+
+# Bygger prefixsummor för försäljning och antal transaktioner per butik och dag.
+# Saknas storeid blir det en enda serie för alla butiker.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_store_series(version: int) -> PrefixSums:
+    tx_df = _shared(_load_transactions(version))
+    return PrefixSums.from_frame(
+        tx_df,
+        date_col="date",
+        measures={"sales": "totalamount", "transactions": None},
+        key_col="storeid" if "storeid" in tx_df.columns else None
+    )
+
+
+def get_store_series() -> PrefixSums:
+    return _load_store_series(data_version())
+
+
+# Bygger prefixsummor för försäljning per kategori och dag. Bara detaljrader vars
+# transaktion har ett giltigt datum ingår, så serien är till för datumintervall.
+# Totaler över all tid räknas med sales_by_category.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_category_series(version: int) -> PrefixSums:
+    details_df = _shared(_load_details(version))
+    products_df = _shared(_load_products_with_categories(version))
+    tx_df = _shared(_load_transactions(version))
+
+    d = merge_details(details_df, products_df).merge(
+        tx_df[["transactionid", "date"]],
+        on="transactionid",
+        how="inner"
+    )
+    return PrefixSums.from_frame(
+        d,
+        date_col="date",
+        measures={"sales": "totalprice"},
+        key_col="category"
+    )
+
+
+def get_category_series() -> PrefixSums:
+    return _load_category_series(data_version())
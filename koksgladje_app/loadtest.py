@@ -0,0 +1,222 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Lasttest för appen. Kör N samtidiga sessioner per sida i samma process
+# via Streamlits AppTest och mäter omkörningstid, CPU-tid och minnestopp.
+# CPU-tid och minnesökning räknas från att alla sessioner är uppvärmda.
+#
+# Körs från projektroten:
+#   python koksgladje_app/loadtest.py --sessions 1 2 4 8 --reruns 10
+
+APP_DIR = Path(__file__).resolve().parent
+
+
+# Startsidan: användaren laddar om sidan
+def _main_step(at, step: int) -> None:
+    at.run()
+
+
+# Transaktioner: användaren bläddrar mellan månader
+def _transactions_step(at, step: int) -> None:
+    if not at.selectbox:
+        at.run()
+        return
+    box = at.selectbox[0]
+    box.select_index(len(box.options) - 1 - step % len(box.options)).run()
+
+
+# Butiker: användaren väljer ett län i taget och rensar ibland filtret
+def _stores_step(at, step: int) -> None:
+    if not at.multiselect:
+        at.run()
+        return
+    box = at.multiselect[0]
+    options = list(box.options)
+    valda = [] if step % 3 == 2 or not options else [options[step % len(options)]]
+    box.set_value(valda).run()
+
+
+# Insikter: användaren flyttar reglaget för värmekartan
+def _insikter_step(at, step: int) -> None:
+    if not at.sidebar.slider:
+        at.run()
+        return
+    at.sidebar.slider[0].set_value(3 + (step * 7) % 22).run()
+
+
+# Produkter: användaren slår upp vad som köps tillsammans med olika produkter
+def _products_step(at, step: int) -> None:
+    if not at.selectbox:
+        at.run()
+        return
+    box = at.selectbox[0]
+    box.select_index((step * 7) % len(box.options)).run()
+
+
+SCENARIOS = {
+    "main": ("main.py", _main_step),
+    "transactions": ("pages/transactions.py", _transactions_step),
+    "stores": ("pages/stores.py", _stores_step),
+    "insikter": ("pages/insikter.py", _insikter_step),
+    "products": ("pages/products.py", _products_step),
+}
+
+
+# Returnerar processens högsta RSS i MB
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux rapporterar kB, macOS byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# AppTest byter ut processglobala objekt (Runtime, config, PagesManager) vid
+# varje körning och tål därför inte att flera instanser kör samtidigt. Alla
+# körningar går genom ett lås, så sessionerna turas om som i en server med en
+# skripttråd i taget och uppmätt tid inkluderar väntan på låset.
+_APPTEST_LOCK = threading.Lock()
+
+
+# Kör en session: en uppvärmande körning, väntar in övriga sessioner vid
+# startlinjen och kör sedan ett antal uppmätta interaktioner.
+# Returnerar (latenser, fel i appen, fel i testverktyget).
+def _run_session(page: str, reruns: int, timeout: float, barrier: threading.Barrier) -> tuple[list[float], int, int]:
+    from streamlit.testing.v1 import AppTest
+
+    script, step_fn = SCENARIOS[page]
+    latencies = []
+    app_errors = 0
+    harness_errors = 0
+
+    try:
+        at = AppTest.from_file(str(APP_DIR / script), default_timeout=timeout)
+        with _APPTEST_LOCK:
+            at.run()
+        app_errors += len(at.exception)
+    except Exception:
+        at = None
+        harness_errors += 1
+
+    # Sessioner som misslyckats i uppvärmningen anländer ändå till startlinjen
+    # så att övriga sessioner kan mätas. Varje körning begränsas av AppTests
+    # timeout, så väntan här behöver ingen egen gräns.
+    barrier.wait()
+    if at is None:
+        return latencies, app_errors, harness_errors
+
+    for step in range(reruns):
+        start = time.perf_counter()
+        try:
+            with _APPTEST_LOCK:
+                step_fn(at, step)
+        except Exception:
+            harness_errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        app_errors += len(at.exception)
+    return latencies, app_errors, harness_errors
+
+
+# Kör en sida med ett givet antal samtidiga sessioner. Körs i en egen process
+# så att minnestopp och cache utgår från ett rent läge för varje nivå.
+def _run_level(page: str, sessions: int, reruns: int, timeout: float) -> dict:
+    # Sidorna importerar getters direkt och databasen ligger relativt projektroten
+    sys.path.insert(0, str(APP_DIR))
+    os.chdir(APP_DIR.parent)
+
+    # Importen av AppTest och uppvärmningen ska inte räknas in i mätningen
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+    # Startvärden läses när alla sessioner är uppvärmda, precis innan de släpps
+    start = {}
+
+    def _mark_start() -> None:
+        start["cpu"] = time.process_time()
+        start["wall"] = time.perf_counter()
+        start["rss"] = _peak_rss_mb()
+
+    barrier = threading.Barrier(sessions, action=_mark_start)
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(
+            lambda _: _run_session(page, reruns, timeout, barrier),
+            range(sessions),
+        ))
+    if not start:
+        # Inga sessioner att mäta
+        _mark_start()
+    wall = time.perf_counter() - start["wall"]
+    cpu = time.process_time() - start["cpu"]
+    peak_rss = _peak_rss_mb()
+
+    latencies = np.array([x for lat, _, _ in results for x in lat]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (float("nan"),) * 3
+
+    return {
+        "page": page,
+        "sessions": sessions,
+        "reruns": int(latencies.size),
+        "app_errors": sum(r[1] for r in results),
+        "harness_errors": sum(r[2] for r in results),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "wall_s": wall,
+        "cpu_s_per_session": cpu / sessions,
+        "baseline_rss_mb": start["rss"],
+        "peak_rss_mb": peak_rss,
+        "rss_growth_mb": peak_rss - start["rss"],
+    }
+
+
+def _print_table(rows: list[dict]) -> None:
+    # fel: undantag i appens skript. verktyg: fel i själva lasttestet.
+    header = (
+        f"{'sida':<13}{'sess':>5}{'körn':>6}{'fel':>5}{'verktyg':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'CPU s/sess':>12}{'RSS MB':>9}{'ΔRSS MB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['page']:<13}{r['sessions']:>5}{r['reruns']:>6}{r['app_errors']:>5}{r['harness_errors']:>8}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+            f"{r['cpu_s_per_session']:>12.2f}{r['peak_rss_mb']:>9.1f}{r['rss_growth_mb']:>9.1f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> list[dict]:
+    parser = argparse.ArgumentParser(description="Lasttest av Streamlit-sidorna med samtidiga sessioner.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Antal samtidiga sessioner per nivå.")
+    parser.add_argument("--reruns", type=int, default=10, help="Antal interaktioner per session.")
+    parser.add_argument("--pages", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS), help="Sidor att testa.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Maxtid per omkörning i sekunder.")
+    parser.add_argument("--json", type=Path, default=None, help="Spara resultatet som JSON.")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for page in args.pages:
+        for sessions in args.sessions:
+            with ctx.Pool(1) as pool:
+                rows.append(pool.apply(_run_level, (page, sessions, args.reruns, args.timeout)))
+
+    _print_table(rows)
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
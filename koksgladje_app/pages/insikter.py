@@ -8,8 +8,11 @@ from getters import (
     get_details,
     get_products_with_categories,
     get_transactions,
-    get_stores
+    get_stores,
+    get_store_series,
+    get_category_series
 )
+from aggregations import merge_details, sales_by_category
 
 # Standardtema för grafer
 sns.set_theme(style="whitegrid")
@@ -31,7 +34,7 @@ if tx_df.empty:
 # Säkerställer att datum är i rätt format
 if "date" in tx_df.columns:
     tx_df["date"] = pd.to_datetime(tx_df["date"], errors="coerce")
-    tx_df = tx_df.dropna(subset=["date"]).copy()
+    tx_df = tx_df.dropna(subset=["date"])
 
 # Formatterare för SEK med mellanslag
 sek_fmt = FuncFormatter(lambda x, p: f"{int(x):,}".replace(",", " "))
@@ -50,24 +53,12 @@ kan_göra_kategori = (
 )
 
 if kan_göra_kategori:
-    # Slår ihop detaljer med kategorier
-    d = details_df.merge(
-        products_df[["productid", "category"]],
-        on="productid",
-        how="left"
-    )
-
-    # Beräknar totalpris om det saknas
-    if "totalprice" not in d.columns and {"quantity", "unitprice"}.issubset(d.columns):
-        d["totalprice"] = d["quantity"] * d["unitprice"]
+    # Slår ihop detaljer med kategorier och beräknar totalpris om det saknas
+    d = merge_details(details_df, products_df)
 
     # Summerar försäljning per kategori
     if "totalprice" in d.columns and "category" in d.columns:
-        cat_sum = (
-            d.groupby("category", dropna=False)["totalprice"]
-             .sum()
-             .sort_values(ascending=False)
-        )
+        cat_sum = sales_by_category(d, dropna=False)
 
         if not cat_sum.empty:
             fig1, ax1 = plt.subplots(figsize=(9, 4))
@@ -91,12 +82,15 @@ else:
 
 st.subheader("Försäljning per månad")
 
-if "date" in tx_df.columns and "totalamount" in tx_df.columns:
+# Prefixsummorna per butik och dag kräver datum och belopp. De hämtas bara
+# när kolumnerna finns, annars visar graferna nedan sina meddelanden.
+har_tidsserie = "date" in tx_df.columns and "totalamount" in tx_df.columns
+
+if har_tidsserie:
     month_sum = (
-        tx_df.assign(month=lambda d: d["date"].dt.to_period("M").dt.to_timestamp())
-             .groupby("month")["totalamount"]
-             .sum()
-             .reset_index()
+        get_store_series().monthly("sales")
+        .rename_axis("month")
+        .reset_index(name="totalamount")
     )
 
     if not month_sum.empty:
@@ -112,6 +106,36 @@ if "date" in tx_df.columns and "totalamount" in tx_df.columns:
 else:
     st.info("Kolumner för datum eller belopp saknas för månadsgrafen.")
 
+# ---------------------------------------------------------
+# Rullande försäljning
+# ---------------------------------------------------------
+
+st.subheader("Rullande försäljning")
+
+# Låter användaren välja fönsterlängd. Varje punkt är en differens i prefixsumman.
+fönster = st.radio(
+    "Fönster.",
+    options=[7, 30, 90],
+    index=1,
+    format_func=lambda d: f"{d} dagar",
+    horizontal=True
+)
+
+if har_tidsserie:
+    rolling = get_store_series().rolling(fönster, "sales")
+    if not rolling.empty:
+        fig_r, ax_r = plt.subplots(figsize=(9, 4))
+        ax_r.plot(rolling.index, rolling.values, color="#2E86C1")
+        ax_r.set_xlabel("Datum")
+        ax_r.set_ylabel("Total försäljning (SEK)")
+        ax_r.yaxis.set_major_formatter(sek_fmt)
+        ax_r.set_title(f"Försäljning senaste {fönster} dagarna")
+        st.pyplot(fig_r)
+    else:
+        st.info("Det finns inga dagsvärden att visa.")
+else:
+    st.info("Kolumner för datum eller belopp saknas för den rullande grafen.")
+
 # ---------------------------------------------------------
 # 3. Försäljning per veckodag
 # ---------------------------------------------------------
@@ -119,8 +143,7 @@ else:
 st.subheader("Försäljning per veckodag")
 
 if "date" in tx_df.columns and "totalamount" in tx_df.columns:
-    wd_df = tx_df.copy()
-    wd_df["_dow"] = wd_df["date"].dt.dayofweek
+    wd_df = tx_df.assign(_dow=tx_df["date"].dt.dayofweek)
 
     ordning = [0, 1, 2, 3, 4, 5, 6]
     etiketter = ["Mån", "Tis", "Ons", "Tor", "Fre", "Lör", "Sön"]
@@ -157,46 +180,19 @@ months_to_show = st.sidebar.slider(
     step=1
 )
 
-# Väljer butiksnamn om det finns, annars storeid
-store_col = None
-if "storename" in tx_df.columns:
-    store_col = "storename"
-elif "storeid" in tx_df.columns:
-    store_col = "storeid"
+if har_tidsserie and "storeid" in tx_df.columns:
+    # Summerar försäljning per butik och månad ur prefixsummorna och behåller de senaste månaderna
+    heat = get_store_series().monthly_by_key("sales").iloc[:, -months_to_show:]
+    heat.columns = heat.columns.strftime("%Y-%m")
 
-# Hämtar butiksnamn om bara ID finns
-stores_df = get_stores()
-if store_col == "storeid" and not stores_df.empty and "storeid" in stores_df.columns:
-    tx_df = tx_df.merge(stores_df[["storeid", "storename"]], on="storeid", how="left")
-    store_col = "storename" if "storename" in tx_df.columns else "storeid"
-
-if store_col and "date" in tx_df.columns and "totalamount" in tx_df.columns:
-    # Skapar YYYY-MM som text för stabila kolumnetiketter
-    tx_df["_ym"] = tx_df["date"].dt.to_period("M").astype(str)
-
-    month_order = sorted(tx_df["_ym"].unique())
-    if month_order:
-        last_n = month_order[-months_to_show:]
-        tx_cut = tx_df[tx_df["_ym"].isin(last_n)].copy()
-    else:
-        tx_cut = tx_df.copy()
-
-    # Summerar försäljning per butik och månad
-    grid = (
-        tx_cut
-        .groupby([store_col, "_ym"])["totalamount"]
-        .sum()
-        .reset_index()
-    )
-
-    if not grid.empty:
-        # Pivot: butiker i rader, månader i kolumner
-        heat = (
-            grid.pivot(index=store_col, columns="_ym", values="totalamount")
-            .reindex(columns=last_n)
-            .fillna(0)
-        )
+    # Visar butiksnamn om de finns, annars storeid
+    store_col = "storeid"
+    if not stores_df.empty and {"storeid", "storename"}.issubset(stores_df.columns):
+        names = stores_df.set_index("storeid")["storename"]
+        heat.index = heat.index.map(lambda sid: names.get(sid, sid))
+        store_col = "storename"
 
+    if not heat.empty:
         # Dynamisk figurstorlek beroende på antal butiker och månader
         cell_h = 0.45
         base_h = 1.5
@@ -222,4 +218,30 @@ if store_col and "date" in tx_df.columns and "totalamount" in tx_df.columns:
     else:
         st.info("Det finns inga värden att visa i värmekartan.")
 else:
-    st.info("Nödvändiga kolumner saknas för värmekartan.")
\ No newline at end of file
+    st.info("Nödvändiga kolumner saknas för värmekartan.")
+
+# ---------------------------------------------------------
+# 5. Kategori × månad
+# ---------------------------------------------------------
+
+st.subheader("Kategori × månad")
+
+# Månadssummor per kategori ur prefixsummorna, för samma antal månader som värmekartan
+if kan_göra_kategori and "date" in tx_df.columns and "transactionid" in tx_df.columns:
+    cat_month = get_category_series().monthly_by_key("sales").iloc[:, -months_to_show:]
+
+    if not cat_month.empty:
+        fig5, ax5 = plt.subplots(figsize=(9, 4))
+        palette = sns.color_palette("crest", n_colors=len(cat_month.index))
+        for färg, (kategori, rad) in zip(palette, cat_month.iterrows()):
+            ax5.plot(rad.index, rad.values, marker="o", label=str(kategori), color=färg)
+        ax5.set_xlabel("Månad")
+        ax5.set_ylabel("Total försäljning (SEK)")
+        ax5.yaxis.set_major_formatter(sek_fmt)
+        ax5.set_title(f"Försäljning per kategori senaste {cat_month.shape[1]} månaderna")
+        ax5.legend(loc="upper left", bbox_to_anchor=(1.01, 1), fontsize="small")
+        st.pyplot(fig5)
+    else:
+        st.info("Det finns inga månadsvärden per kategori att visa.")
+else:
+    st.info("Kategorier per månad kan inte beräknas eftersom kategori- eller datumdata saknas.")
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-from getters import get_details, get_products_with_categories
+from getters import get_details, get_products_with_categories, get_basket_index
+from aggregations import merge_details, sales_by_category, top_products
 
 # Sidhuvud
 st.header("Produkter")
@@ -19,25 +20,15 @@ if details_df.empty:
     st.info("Inga produktdetaljer hittades.")
     st.stop()
 
-# Beräknar totalpris om kolumnen saknas men quantity och unitprice finns
-if "totalprice" not in details_df.columns and {"quantity", "unitprice"}.issubset(details_df.columns):
-    details_df["totalprice"] = details_df["quantity"] * details_df["unitprice"]
+# Slår ihop produktdetaljer med produktnamn och kategori om möjligt.
+# Totalpris beräknas från quantity och unitprice om kolumnen saknas.
+merged = merge_details(details_df, products_df)
 
 # Stoppar om totalprice fortfarande saknas
-if "totalprice" not in details_df.columns:
+if "totalprice" not in merged.columns:
     st.warning("Kolumnen totalprice saknas.")
     st.stop()
 
-# Slår ihop produktdetaljer med produktnamn och kategori om möjligt
-if "productid" in products_df.columns:
-    merged = details_df.merge(
-        products_df[["productid", "productname", "category"]],
-        on="productid",
-        how="left"
-    )
-else:
-    merged = details_df.copy()
-
 # Sektion: topp 10 produkter
 st.subheader("Topp 10 produkter")
 
@@ -45,12 +36,7 @@ st.subheader("Topp 10 produkter")
 name_col = "productname" if "productname" in merged.columns else "productid"
 
 # Summerar försäljning och tar topp 10
-top10 = (
-    merged.groupby(name_col)["totalprice"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(10)
-)
+top10 = top_products(merged, name_col, n=10)
 
 # Diagram för topp 10
 fig1, ax1 = plt.subplots(figsize=(8, 5))
@@ -79,11 +65,7 @@ st.dataframe(tab, use_container_width=True)
 if "category" in merged.columns:
     st.subheader("Försäljning per kategori")
 
-    cat_sum = (
-        merged.groupby("category")["totalprice"]
-        .sum()
-        .sort_values(ascending=False)
-    )
+    cat_sum = sales_by_category(merged)
 
     fig2, ax2 = plt.subplots(figsize=(9, 4))
     sns.barplot(
@@ -96,4 +78,61 @@ if "category" in merged.columns:
     ax2.set_ylabel("Total försäljning (SEK)")
     ax2.set_title("Kategori")
     plt.xticks(rotation=30, ha="right")
-    st.pyplot(fig2)
\ No newline at end of file
+    st.pyplot(fig2)
+
+# Sektion: produkter som köps tillsammans med en vald produkt.
+# Korganalysen bygger på productid i detaljraderna.
+if "productid" in products_df.columns and "productid" in merged.columns and not products_df.empty:
+    st.subheader("Köps ofta tillsammans")
+
+    names = (
+        products_df.set_index("productid")["productname"]
+        if "productname" in products_df.columns
+        else pd.Series(products_df["productid"].astype(str).values, index=products_df["productid"])
+    )
+
+    # Föreslår bästsäljaren som startval om försäljningen går att summera per produkt
+    options = list(names.index)
+    start_index = 0
+    per_product = merged.groupby("productid")["totalprice"].sum(min_count=1).dropna()
+    if not per_product.empty and per_product.idxmax() in options:
+        start_index = options.index(per_product.idxmax())
+
+    val_product = st.selectbox(
+        "Välj produkt.",
+        options=options,
+        index=start_index,
+        format_func=lambda pid: str(names.get(pid, pid))
+    )
+    sortering = st.radio("Sortera på.", options=["Antal korgar", "Lyft"], horizontal=True)
+
+    # Lyft blir brusigt för sällsynta par, så den listan kräver några gemensamma korgar
+    min_korgar = 3
+    if sortering == "Lyft":
+        st.caption(f"Visar par som köpts tillsammans i minst {min_korgar} korgar.")
+
+    together = get_basket_index().bought_together(
+        val_product,
+        top=10,
+        min_count=min_korgar if sortering == "Lyft" else 1,
+        sort_by="lift" if sortering == "Lyft" else "count"
+    )
+
+    if together.empty:
+        if sortering == "Lyft":
+            st.info(f"Ingen produkt har köpts tillsammans med den här i minst {min_korgar} korgar.")
+        else:
+            st.info("Produkten har inte köpts tillsammans med någon annan produkt.")
+    else:
+        together.insert(0, "produkt", together["productid"].map(names))
+        st.dataframe(
+            together.drop(columns="productid")
+            .round({"support": 3, "confidence": 2, "lift": 2})
+            .rename(columns={
+                "count": "antal korgar",
+                "support": "andel av korgar",
+                "confidence": "konfidens",
+                "lift": "lyft",
+            }),
+            use_container_width=True
+        )
@@ -23,7 +23,7 @@ if tx.empty:
 if "storeid" in tx.columns and not stores.empty:
     df = pd.merge(tx, stores, on="storeid", how="left")
 else:
-    df = tx.copy()
+    df = tx
 
 # Identifierar kolumner för butiksnamn och försäljningsbelopp
 name_col = "storename" if "storename" in df.columns else ("storeid" if "storeid" in df.columns else None)
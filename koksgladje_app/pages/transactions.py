@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-from getters import get_transactions, get_customers, get_stores
+from getters import get_transactions, get_customers, get_stores, get_store_series
+from aggregations import daily_sales
 
 # Sidhuvud
 st.header("Transaktioner")
@@ -22,7 +23,7 @@ if tx.empty or "date" not in tx.columns:
 
 # Konverterar datum och filtrerar bort ogiltiga värden
 tx["date"] = pd.to_datetime(tx["date"], errors="coerce")
-tx = tx.dropna(subset=["date"]).copy()
+tx = tx.dropna(subset=["date"])
 
 # Skapar år-månad-kolumn för filtrering
 tx["year_month"] = tx["date"].dt.to_period("M").dt.to_timestamp()
@@ -42,21 +43,40 @@ val_month = st.selectbox(
 )
 
 # Filtrerar transaktioner för vald månad
-cur = tx[tx["year_month"] == val_month].copy()
+cur = tx[tx["year_month"] == val_month]
 if cur.empty:
     st.info("Inga transaktioner för vald månad.")
     st.stop()
 
-# Nyckeltal: antal transaktioner, total försäljning, snittkorg
-tot_trans = int(cur["transactionid"].nunique()) if "transactionid" in cur.columns else len(cur)
-tot_sek = float(cur["totalamount"].sum()) if "totalamount" in cur.columns else float("nan")
-aov = (tot_sek / tot_trans) if (tot_trans and pd.notna(tot_sek)) else float("nan")
+# Nyckeltal: antal transaktioner, total försäljning, snittkorg.
+# Månaderna läses ur prefixsummorna så jämförelserna kostar ingen omräkning.
+series = get_store_series()
+tot_trans, prev_trans, d_trans = series.mom(val_month, "transactions")
+tot_sek, prev_sek, d_sek = series.mom(val_month, "sales")
+_, ly_sek, yoy_sek = series.yoy(val_month, "sales")
+aov = (tot_sek / tot_trans) if tot_trans else float("nan")
+prev_aov = (prev_sek / prev_trans) if prev_trans else float("nan")
 
-# Visar nyckeltal i tre kolumner
+
+# Formatterar en förändring med tecken och mellanslag som tusentalsavgränsare
+def delta_text(delta: float, prev: float) -> str | None:
+    if not prev or pd.isna(prev):
+        return None
+    return f"{delta:+,.0f} ({delta / prev:+.1%})".replace(",", " ")
+
+
+# Visar nyckeltal i tre kolumner med förändring mot föregående månad
 c1, c2, c3 = st.columns(3)
-c1.metric("Antal transaktioner", f"{tot_trans:,}".replace(",", " "))
-c2.metric("Total försäljning (SEK)", f"{tot_sek:,.0f}".replace(",", " ") if pd.notna(tot_sek) else "–")
-c3.metric("Snittkorg (SEK)", f"{aov:,.0f}".replace(",", " ") if pd.notna(aov) else "–")
+c1.metric("Antal transaktioner", f"{tot_trans:,.0f}".replace(",", " "), delta=delta_text(d_trans, prev_trans))
+c2.metric("Total försäljning (SEK)", f"{tot_sek:,.0f}".replace(",", " "), delta=delta_text(d_sek, prev_sek))
+c3.metric(
+    "Snittkorg (SEK)",
+    f"{aov:,.0f}".replace(",", " ") if pd.notna(aov) else "–",
+    delta=delta_text(aov - prev_aov, prev_aov) if pd.notna(aov) else None
+)
+
+if ly_sek:
+    st.caption(f"Jämfört med samma månad i fjol: {yoy_sek:+,.0f} SEK ({yoy_sek / ly_sek:+.1%}).".replace(",", " "))
 
 # Sektion: toppkunder eller toppbutiker
 st.subheader("Flest transaktioner denna månad")
@@ -85,7 +105,7 @@ if not cust.empty and "customerid" in cur.columns and "transactionid" in cur.col
 
 # Om inga kunder plottades, visa toppbutiker istället
 if not plotted and "transactionid" in cur.columns:
-    cur_s = cur.copy()
+    cur_s = cur
     name_col = None
 
     # Försök använda butiksnamn om det finns
@@ -115,7 +135,7 @@ if not plotted and "transactionid" in cur.columns:
 
 # Daglig försäljning som linjediagram
 if "totalamount" in cur.columns:
-    ts = cur.groupby(pd.Grouper(key="date", freq="D"))["totalamount"].sum().reset_index()
+    ts = daily_sales(cur).reset_index()
     fig_t, ax_t = plt.subplots(figsize=(10, 4))
     sns.lineplot(data=ts, x="date", y="totalamount", ax=ax_t, marker="o", color="#2E86C1")
     ax_t.set_title(f"Försäljning per dag. {val_month.strftime('%Y-%m')}")
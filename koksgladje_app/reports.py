@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+# Ingen skärm behövs. Agg renderar direkt till fil i varje arbetsprocess.
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from matplotlib.ticker import FuncFormatter
+
+from aggregations import daily_sales, merge_details, sales_by_category, top_products
+
+# Batchgenerator för månadsrapporter per butik: försäljning per dag,
+# toppprodukter och kategorimix. Alla butik × månad räknas i ett svep och
+# figurerna renderas parallellt. Bara månader vars data ändrats ritas om.
+#
+# Körs från projektroten:
+#   python koksgladje_app/reports.py --out reports --format png pdf
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Höjs när rapportens layout ändras så att alla månader ritas om
+REPORT_VERSION = 2
+
+INDEX_FILE = "index.json"
+
+_HASH_MOD = 2**31 - 1
+
+
+# Formatterare för SEK med mellanslag
+sek_fmt = FuncFormatter(lambda x, p: f"{int(x):,}".replace(",", " "))
+
+
+# Räknar ut alla aggregat för butik × månad i ett svep
+def build_aggregates(tx: pd.DataFrame, details: pd.DataFrame, products: pd.DataFrame, stores: pd.DataFrame) -> dict:
+    tx = tx.dropna(subset=["date"])
+    tx = tx.assign(ym=tx["date"].dt.to_period("M").astype(str))
+
+    # Kopplar varje detaljrad till butik och månad via transaktionen
+    merged = merge_details(details, products).merge(
+        tx[["transactionid", "storeid", "ym"]],
+        on="transactionid",
+        how="inner"
+    )
+    name_col = "productname" if "productname" in merged.columns else "productid"
+
+    keys = ["storeid", "ym"]
+    names = stores.set_index("storeid")["storename"] if "storename" in stores.columns else pd.Series(dtype=object)
+
+    return {
+        "daily": {key: _fill_month(part, key[1]) for key, part in _split(daily_sales(tx, by=keys)).items()},
+        "top": _split(top_products(merged, name_col, n=10, by=keys)),
+        "categories": _split(sales_by_category(merged, by=keys, dropna=False)) if "category" in merged.columns else {},
+        "pairs": list(tx[keys].drop_duplicates().sort_values(keys).itertuples(index=False, name=None)),
+        "store_names": names.to_dict(),
+        "fingerprints": _month_fingerprints(tx.assign(storename=tx["storeid"].map(names)), merged),
+    }
+
+
+# Fingeravtryck per månad över transaktioner och detaljrader, inklusive
+# butiksnamn, produktnamn och kategorier som skrivs ut i rapporterna.
+# Ändras någon rad eller etikett i en månad ändras månadens fingeravtryck.
+def _month_fingerprints(tx: pd.DataFrame, merged: pd.DataFrame) -> dict[str, str]:
+    tx_cols = [c for c in ["transactionid", "storeid", "storename", "date", "totalamount"] if c in tx.columns]
+    d_cols = [
+        c for c in ["transactionid", "productid", "productname", "category", "quantity", "totalprice"]
+        if c in merged.columns
+    ]
+
+    # Radhashar reduceras modulo ett primtal så att summan ryms exakt i int64
+    tx_hash = (pd.util.hash_pandas_object(tx[tx_cols], index=False) % _HASH_MOD).astype("int64").groupby(tx["ym"]).sum()
+    d_hash = (pd.util.hash_pandas_object(merged[d_cols], index=False) % _HASH_MOD).astype("int64").groupby(merged["ym"]).sum()
+
+    months = tx_hash.index.union(d_hash.index)
+    tx_hash = tx_hash.reindex(months, fill_value=0)
+    d_hash = d_hash.reindex(months, fill_value=0)
+    return {ym: f"{REPORT_VERSION}-{int(a):x}-{int(b):x}" for ym, a, b in zip(months, tx_hash, d_hash)}
+
+
+# Delar ett aggregat med (storeid, ym) först i indexet i en serie per grupp
+def _split(series: pd.Series) -> dict:
+    if series.empty:
+        return {}
+    return {key: part.droplevel([0, 1]) for key, part in series.groupby(level=[0, 1], sort=False)}
+
+
+# Fyller en månads dagsserie med 0 för dagar utan försäljning. Med extra
+# grupperingsnycklar returnerar daily_sales bara dagar som har försäljning.
+def _fill_month(daily: pd.Series, ym: str) -> pd.Series:
+    period = pd.Period(ym, freq="M")
+    days = pd.date_range(period.start_time, period.end_time.normalize(), freq="D", unit=daily.index.unit)
+    return daily.reindex(days, fill_value=0)
+
+
+# Ritar en rapport för en butik och månad. Körs i en arbetsprocess.
+def render_report(task: dict) -> list[str]:
+    sns.set_theme(style="whitegrid")
+
+    daily, top, cats = task["daily"], task["top"], task["categories"]
+    title = f"{task['store']}. {task['ym']}"
+
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(9, 12))
+
+    if not daily.empty:
+        ax1.plot(daily.index, daily.values, marker="o", color="#2E86C1")
+    ax1.set_title(f"Försäljning per dag. {title}")
+    ax1.set_xlabel("Datum")
+    ax1.set_ylabel("SEK")
+    ax1.yaxis.set_major_formatter(sek_fmt)
+    ax1.tick_params(axis="x", rotation=30)
+
+    if not top.empty:
+        top.iloc[::-1].plot(kind="barh", color=sns.color_palette("crest", n_colors=len(top)), ax=ax2)
+    ax2.set_title("Topp 10 produkter")
+    ax2.set_xlabel("Total försäljning (SEK)")
+    ax2.set_ylabel("Produkt")
+    ax2.xaxis.set_major_formatter(sek_fmt)
+
+    if not cats.empty:
+        ax3.bar(cats.index.astype(str), cats.values, color=sns.color_palette("crest", n_colors=len(cats)))
+    ax3.set_title("Kategorimix")
+    ax3.set_xlabel("Kategori")
+    ax3.set_ylabel("Total försäljning (SEK)")
+    ax3.yaxis.set_major_formatter(sek_fmt)
+    ax3.tick_params(axis="x", rotation=30)
+
+    fig.tight_layout()
+
+    out = Path(task["path"])
+    out.parent.mkdir(parents=True, exist_ok=True)
+    files = []
+    for fmt in task["formats"]:
+        target = out.with_suffix(f".{fmt}")
+        fig.savefig(target, format=fmt, dpi=120)
+        files.append(str(target))
+    plt.close(fig)
+    return files
+
+
+def _load_index(out_dir: Path) -> dict:
+    path = out_dir / INDEX_FILE
+    if not path.exists():
+        return {"months": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# Returnerar månader vars data ändrats, vars filer saknas eller som begärts om
+def _stale_months(index: dict, fingerprints: dict[str, str], out_dir: Path, formats: list[str], force: bool) -> set[str]:
+    stale = set()
+    for ym, fp in fingerprints.items():
+        entry = index["months"].get(ym)
+        if force or entry is None or entry.get("fingerprint") != fp or sorted(entry.get("formats", [])) != sorted(formats):
+            stale.add(ym)
+            continue
+        if not all((out_dir / f).exists() for r in entry["reports"] for f in r["files"]):
+            stale.add(ym)
+    return stale
+
+
+def generate(out_dir: Path, formats: list[str], workers: int | None = None, force: bool = False) -> dict:
+    from getters import get_details, get_products_with_categories, get_stores, get_transactions
+
+    agg = build_aggregates(get_transactions(), get_details(), get_products_with_categories(), get_stores())
+    index = _load_index(out_dir)
+    stale = _stale_months(index, agg["fingerprints"], out_dir, formats, force)
+
+    # Tar bort månader som inte längre finns i datan
+    for ym in set(index["months"]) - set(agg["fingerprints"]):
+        shutil.rmtree(out_dir / ym, ignore_errors=True)
+        del index["months"][ym]
+
+    # Rensar ändrade månader så att inga rapporter för försvunna butiker blir kvar
+    for ym in stale:
+        shutil.rmtree(out_dir / ym, ignore_errors=True)
+
+    empty = pd.Series(dtype=float)
+    tasks = []
+    for storeid, ym in agg["pairs"]:
+        if ym not in stale:
+            continue
+        tasks.append({
+            "storeid": storeid,
+            "ym": ym,
+            "store": agg["store_names"].get(storeid, f"Butik {storeid}"),
+            "daily": agg["daily"].get((storeid, ym), empty),
+            "top": agg["top"].get((storeid, ym), empty),
+            "categories": agg["categories"].get((storeid, ym), empty),
+            "path": str(out_dir / ym / f"store_{storeid}"),
+            "formats": formats,
+        })
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rendered = list(pool.map(render_report, tasks))
+
+    for ym in stale:
+        index["months"][ym] = {"fingerprint": agg["fingerprints"][ym], "formats": formats, "reports": []}
+    for task, files in zip(tasks, rendered):
+        index["months"][task["ym"]]["reports"].append({
+            "storeid": int(task["storeid"]),
+            "store": task["store"],
+            "files": [str(Path(f).relative_to(out_dir)) for f in files],
+        })
+    index["months"] = dict(sorted(index["months"].items()))
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / INDEX_FILE).write_text(json.dumps(index, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(f"Ritade {len(tasks)} rapporter för {len(stale)} månader. {len(agg['fingerprints']) - len(stale)} månader oförändrade.")
+    return index
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Skapar månadsrapporter per butik.")
+    parser.add_argument("--out", type=Path, default=Path("reports"), help="Katalog för rapporterna.")
+    parser.add_argument("--format", nargs="+", choices=["png", "pdf"], default=["png"], help="Filformat.")
+    parser.add_argument("--workers", type=int, default=None, help="Antal arbetsprocesser.")
+    parser.add_argument("--force", action="store_true", help="Rita om alla månader.")
+    args = parser.parse_args(argv)
+
+    # Getters läser databasen relativt projektroten
+    out_dir = args.out.resolve()
+    sys.path.insert(0, str(APP_DIR))
+    os.chdir(APP_DIR.parent)
+    return generate(out_dir, args.format, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
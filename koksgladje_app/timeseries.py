@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Tidsseriemotor med kumulativa summor per nyckel (butik, kategori) och dag.
+# Summan för ett godtyckligt datumintervall är skillnaden mellan två värden
+# i prefixsumman, så varje fråga kostar O(1) oavsett hur lång perioden är.
+
+
+class PrefixSums:
+    def __init__(self, start: pd.Timestamp, keys: pd.Index, cums: dict[str, np.ndarray]):
+        self.start = start
+        self.keys = keys
+        # cums[mått] har formen (nycklar, dagar + 1) och börjar med en nollkolumn
+        self.cums = cums
+        self.totals = {m: c.sum(axis=0) for m, c in cums.items()}
+        self.n_days = next(iter(cums.values())).shape[1] - 1 if cums else 0
+        self._key_pos = {k: i for i, k in enumerate(keys)}
+
+    # Bygger prefixsummor ur en tabell. measures mappar måttnamn till kolumn,
+    # eller None för att räkna rader.
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, date_col: str, measures: dict[str, str | None], key_col: str | None = None) -> "PrefixSums":
+        df = df.dropna(subset=[date_col])
+        days = df[date_col].dt.normalize()
+
+        if df.empty:
+            return cls(pd.NaT, pd.Index([]), {m: np.zeros((0, 1)) for m in measures})
+
+        start = days.min()
+        day_idx = (days - start).dt.days.to_numpy()
+        n_days = int(day_idx.max()) + 1
+
+        if key_col is None:
+            key_codes, keys = np.zeros(len(df), dtype=np.int64), pd.Index(["alla"])
+        else:
+            key_codes, keys = pd.factorize(df[key_col], sort=True, use_na_sentinel=False)
+
+        # Platt index nyckel × dag så att varje mått summeras med en bincount
+        flat = key_codes * n_days + day_idx
+        size = len(keys) * n_days
+
+        cums = {}
+        for name, col in measures.items():
+            weights = None if col is None else df[col].fillna(0).to_numpy(dtype=float)
+            grid = np.bincount(flat, weights=weights, minlength=size).reshape(len(keys), n_days)
+            cums[name] = np.concatenate([np.zeros((len(keys), 1)), grid.cumsum(axis=1)], axis=1)
+        return cls(start, keys, cums)
+
+    # Position i prefixsumman för början av en dag, begränsad till rutnätet
+    def _pos(self, date) -> int:
+        if self.n_days == 0:
+            return 0
+        return int(np.clip((pd.Timestamp(date).normalize() - self.start).days, 0, self.n_days))
+
+    def _row(self, measure: str, key) -> np.ndarray:
+        if key is None:
+            return self.totals[measure]
+        pos = self._key_pos.get(key)
+        return np.zeros(self.n_days + 1) if pos is None else self.cums[measure][pos]
+
+    # Summa för ett datumintervall där båda ändpunkterna ingår
+    def total(self, start, end, measure: str, key=None) -> float:
+        row = self._row(measure, key)
+        lo = 0 if start is None else self._pos(start)
+        hi = self.n_days if end is None else self._pos(pd.Timestamp(end) + pd.Timedelta(days=1))
+        return float(row[hi] - row[lo]) if hi > lo else 0.0
+
+    # Summa per nyckel för ett datumintervall
+    def totals_by_key(self, start, end, measure: str) -> pd.Series:
+        lo = 0 if start is None else self._pos(start)
+        hi = self.n_days if end is None else self._pos(pd.Timestamp(end) + pd.Timedelta(days=1))
+        cum = self.cums[measure]
+        values = cum[:, hi] - cum[:, lo] if hi > lo else np.zeros(len(self.keys))
+        return pd.Series(values, index=self.keys, name=measure)
+
+    # Summa för en kalendermånad
+    def month_total(self, month, measure: str, key=None) -> float:
+        first = pd.Timestamp(month).to_period("M").to_timestamp()
+        return self.total(first, first + pd.offsets.MonthEnd(0), measure, key)
+
+    # Jämför en månad med föregående månad. Returnerar (nu, då, skillnad).
+    def mom(self, month, measure: str, key=None) -> tuple[float, float, float]:
+        cur = self.month_total(month, measure, key)
+        prev = self.month_total(pd.Timestamp(month) - pd.DateOffset(months=1), measure, key)
+        return cur, prev, cur - prev
+
+    # Jämför en månad med samma månad föregående år. Returnerar (nu, då, skillnad).
+    def yoy(self, month, measure: str, key=None) -> tuple[float, float, float]:
+        cur = self.month_total(month, measure, key)
+        prev = self.month_total(pd.Timestamp(month) - pd.DateOffset(years=1), measure, key)
+        return cur, prev, cur - prev
+
+    # Månadssummor som serie med månadens första dag som index
+    def monthly(self, measure: str, key=None) -> pd.Series:
+        return self._monthly_row(self._row(measure, key))
+
+    # Månadssummor per nyckel. Rader är nycklar, kolumner är månader.
+    def monthly_by_key(self, measure: str, keys=None) -> pd.DataFrame:
+        months = self.months()
+        cum = self.cums[measure]
+        bounds = self._month_bounds(months)
+        values = cum[:, bounds[1:]] - cum[:, bounds[:-1]]
+        table = pd.DataFrame(values, index=self.keys, columns=months)
+        return table if keys is None else table.reindex(keys, fill_value=0.0)
+
+    # Rullande summa över de senaste window dagarna för varje dag
+    def rolling(self, window: int, measure: str, key=None) -> pd.Series:
+        row = self._row(measure, key)
+        hi = np.arange(1, self.n_days + 1)
+        lo = np.maximum(hi - window, 0)
+        days = pd.date_range(self.start, periods=self.n_days, freq="D") if self.n_days else pd.DatetimeIndex([])
+        return pd.Series(row[hi] - row[lo], index=days, name=measure)
+
+    # Alla månader som rutnätet täcker
+    def months(self) -> pd.DatetimeIndex:
+        if self.n_days == 0:
+            return pd.DatetimeIndex([])
+        end = self.start + pd.Timedelta(days=self.n_days - 1)
+        return pd.period_range(self.start, end, freq="M").to_timestamp()
+
+    def _month_bounds(self, months: pd.DatetimeIndex) -> np.ndarray:
+        edges = list(months) + [months[-1] + pd.offsets.MonthBegin(1)] if len(months) else []
+        return np.array([self._pos(d) for d in edges], dtype=np.int64)
+
+    def _monthly_row(self, row: np.ndarray) -> pd.Series:
+        months = self.months()
+        bounds = self._month_bounds(months)
+        return pd.Series(row[bounds[1:]] - row[bounds[:-1]] if len(months) else [], index=months, dtype=float)